@@ -1,54 +1,129 @@
 import sys
+import logging
 import asyncio
 import argparse
-import httpx
+from collections import defaultdict
 
 from port_common.settings import PortSettings
-from port_common.api import find_yaml_files, process_file
+from port_common.api import (
+    MAX_KEEPALIVE_CONNECTIONS,
+    find_yaml_files,
+    get_blueprint_schema,
+    make_client,
+    parse_file,
+    prefetch_entities,
+    process_file,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+async def validate_files(client, settings, parsed_files, identifiers_by_blueprint, fail_fast):
+    """Validate parsed files against Port and return their errors by file path.
+    
+    Stops at the first failing file when fail_fast is set.
+    """
+    # Search entities and warm the schema cache for every blueprint at the same time;
+    # a failed schema fetch is shared and reported against each file by process_file
+    await asyncio.gather(
+        prefetch_entities(client, settings, identifiers_by_blueprint),
+        *(get_blueprint_schema(client, settings, blueprint) for blueprint in identifiers_by_blueprint),
+        return_exceptions=True,
+    )
+    
+    # Cap in-flight files at the keep-alive pool size to avoid connection churn and 429s
+    semaphore = asyncio.Semaphore(MAX_KEEPALIVE_CONNECTIONS)
+    
+    async def bounded_process_file(file_path, data):
+        async with semaphore:
+            return file_path, await process_file(client, settings, file_path, data)
+    
+    tasks = [asyncio.create_task(bounded_process_file(file_path, data)) for file_path, data in parsed_files.items()]
+    errors_by_file = {}
+    for next_result in asyncio.as_completed(tasks):
+        file_path, file_errors = await next_result
+        errors_by_file[file_path] = file_errors
+        if file_errors and fail_fast:
+            for task in tasks:
+                task.cancel()
+            # Let cancelled requests unwind before the client is closed
+            await asyncio.gather(*tasks, return_exceptions=True)
+            break
+    
+    return errors_by_file
 
 
 async def main():
     parser = argparse.ArgumentParser(description="Validate YAML files against Port API")
     parser.add_argument("--paths", nargs="+", help="Paths to YAML files or directories to scan")
+    parser.add_argument("--fail-fast", action="store_true", help="Stop at the first file that fails validation")
     args = parser.parse_args()
     
+    # Configure only this tool's loggers so library INFO output (e.g. httpx requests) stays quiet
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    for name in ("port_common", __name__):
+        app_logger = logging.getLogger(name)
+        app_logger.addHandler(handler)
+        app_logger.setLevel(logging.INFO)
+    
     try:
         settings = PortSettings()
     except Exception as e:
-        print(f"❌ Error loading environment variables: {str(e)}")
+        logger.error(f"❌ Error loading environment variables: {str(e)}")
         sys.exit(1)
     
-    errors = []
+    # Errors keyed by file path, so the report follows discovery order
+    errors_by_file = {}
     
     # Find YAML files to validate using our shared function
     changed_files = find_yaml_files(args.paths if args.paths else None)
     
     if not changed_files:
-        print("No YAML files found to validate")
+        logger.info("No YAML files found to validate")
         return
         
-    print(f"Found {len(changed_files)} YAML files to validate")
-    
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        # First obtain the access token
-        try:
-            await settings.get_access_token(client)
-        except Exception as e:
-            print(f"❌ Error obtaining access token: {str(e)}")
-            sys.exit(1)
-            
-        tasks = [process_file(client, settings, file_path) for file_path in changed_files]
-        results = await asyncio.gather(*tasks)
+    logger.info(f"Found {len(changed_files)} YAML files to validate")
+    
+    # A single pooled client lets every request reuse warm connections
+    async with make_client() as client:
+        # Obtain the access token while the files are parsed in worker threads
+        token_task = asyncio.create_task(settings.get_access_token(client))
+        parse_results = await asyncio.gather(*(asyncio.to_thread(parse_file, file_path) for file_path in changed_files))
         
-        for file_errors in results:
-            errors.extend(file_errors)
+        # Group the parsed files so existence checks can be batched per blueprint
+        parsed_files = {}
+        identifiers_by_blueprint = defaultdict(list)
+        for file_path, (data, file_errors) in zip(changed_files, parse_results):
+            if file_errors:
+                errors_by_file[file_path] = file_errors
+                continue
+            parsed_files[file_path] = data
+            identifiers_by_blueprint[data["blueprint"]].append(data["identifier"])
+        
+        if errors_by_file and args.fail_fast:
+            # A file is already broken, so don't spend any API calls
+            token_task.cancel()
+            await asyncio.gather(token_task, return_exceptions=True)
+        else:
+            try:
+                await token_task
+            except Exception as e:
+                logger.error(f"❌ Error obtaining access token: {str(e)}")
+                sys.exit(1)
+            
+            errors_by_file.update(await validate_files(client, settings, parsed_files, identifiers_by_blueprint, args.fail_fast))
+    
+    # Parse and Port errors interleave per file in discovery order, regardless of completion order
+    errors = [error for file_path in dict.fromkeys(changed_files) for error in errors_by_file.get(file_path, [])]
     
+    # Write the report in one go rather than one line at a time
     if errors:
-        for e in errors:
-            print("❌", e)
+        sys.stdout.write("\n".join(f"❌ {e}" for e in errors) + "\n")
         sys.exit(1)
     else:
-        print("✅ All YAML files validated successfully.")
+        sys.stdout.write("✅ All YAML files validated successfully.\n")
 
 
 if __name__ == "__main__":
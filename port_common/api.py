@@ -1,47 +1,179 @@
+import os
+import logging
+import random
+import functools
+import asyncio
 import httpx
+import orjson
 import yaml
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Optional, Set, Tuple, List
 from pathlib import Path
 
 from port_common.settings import PortSettings
 from port_common.models import PortYaml
 
+logger = logging.getLogger(__name__)
+
+try:
+    from yaml import CSafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as CSafeLoader
+
+_yaml_load = functools.partial(yaml.load, Loader=CSafeLoader)
+
+# Connection pool sizing for the shared Port API client
+MAX_KEEPALIVE_CONNECTIONS = 20
+MAX_CONNECTIONS = 100
+
+# File name suffixes treated as YAML files
+YAML_EXTENSIONS = (".yaml", ".yml")
+
+# Retry policy for transient Port API failures
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 0.25
+MAX_RETRY_AFTER = 10.0  # Upper bound in seconds on a server-requested Retry-After wait
+
+# Blueprint schema fetches keyed by blueprint identifier, shared by all files in a run
+_schema_tasks: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+
+# Identifiers looked up by prefetch_entities, and those of them found in Port, keyed by blueprint
+_searched_entities: Dict[str, Set[str]] = {}
+_existing_entities: Dict[str, Set[str]] = {}
+
+
+def make_client() -> httpx.AsyncClient:
+    """Create the HTTP client shared by all Port API calls."""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            max_connections=MAX_CONNECTIONS,
+        ),
+        http2=True,
+        timeout=httpx.Timeout(30.0, connect=5.0),
+    )
+
+
+async def _request_with_retries(client: httpx.AsyncClient, method: str, url: str, **kwargs) -> httpx.Response:
+    """Send a request, retrying transport errors and transient responses with exponential backoff."""
+    for attempt in range(MAX_RETRIES + 1):
+        delay = RETRY_BASE_DELAY * 2 ** attempt + random.random() * 0.1
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            if attempt == MAX_RETRIES:
+                raise
+        else:
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt == MAX_RETRIES:
+                return response
+            # Honor the server's requested wait on rate limiting
+            retry_after = response.headers.get("Retry-After")
+            if response.status_code == 429 and retry_after:
+                try:
+                    delay = min(float(retry_after), MAX_RETRY_AFTER)
+                except ValueError:
+                    pass
+        await asyncio.sleep(delay)
+
 
 def load_yaml(path: str) -> Dict[str, Any]:
     """Load and parse a YAML file."""
-    with open(path, "r") as f:
-        return yaml.safe_load(f)
+    with open(path, "rb") as f:
+        return _yaml_load(f)
 
 
 async def get_entity(client: httpx.AsyncClient, settings: PortSettings, identifier: str, blueprint: str) -> bool:
     """Check if an entity exists in Port."""
+    # Answer from the batched search results when this identifier was part of them
+    if identifier in _searched_entities.get(blueprint, ()):
+        return identifier in _existing_entities[blueprint]
+    
     # Check if token needs refresh
     if settings.token_expired:
         await settings.get_access_token(client)
         
-    url = f"{settings.PORT_BASE_URL}/blueprints/{blueprint}/entities/{identifier}"
-    response = await client.get(url, headers=settings.headers)
+    url = settings.entity_url(blueprint, identifier)
+    response = await _request_with_retries(client, "GET", url, headers=settings.headers)
     return response.status_code == 200
 
-async def get_blueprint_schema(client: httpx.AsyncClient, settings: PortSettings, blueprint: str) -> Dict[str, Any]:
-    """Get the schema for a blueprint from Port."""
+
+async def get_existing_entities(client: httpx.AsyncClient, settings: PortSettings, blueprint: str, identifiers: List[str]) -> Set[str]:
+    """Return which of the given identifiers exist in Port, using a single search request."""
+    # Check if token needs refresh
+    if settings.token_expired:
+        await settings.get_access_token(client)
+    
+    url = settings.entities_search_url()
+    payload = {
+        "combinator": "and",
+        "rules": [
+            {"property": "$blueprint", "operator": "=", "value": blueprint},
+            {"property": "$identifier", "operator": "in", "value": identifiers},
+        ],
+    }
+    response = await _request_with_retries(client, "POST", url, json=payload, headers=settings.headers)
+    if response.status_code != 200:
+        raise ValueError(f"Entity search failed for blueprint '{blueprint}': {response.text}")
+    return {entity["identifier"] for entity in orjson.loads(response.content).get("entities", [])}
+
+
+async def prefetch_entities(client: httpx.AsyncClient, settings: PortSettings, identifiers_by_blueprint: Dict[str, List[str]]) -> None:
+    """Look up entity existence for every blueprint with one search request each."""
+    async def prefetch(blueprint: str, identifiers: List[str]) -> None:
+        try:
+            existing = await get_existing_entities(client, settings, blueprint, identifiers)
+        except Exception as e:
+            # get_entity falls back to one request per entity for these identifiers
+            logger.warning(f"Warning: could not prefetch entities of blueprint '{blueprint}': {str(e)}")
+            return
+        _existing_entities.setdefault(blueprint, set()).update(existing)
+        _searched_entities.setdefault(blueprint, set()).update(identifiers)
+    
+    await asyncio.gather(*(prefetch(bp, ids) for bp, ids in identifiers_by_blueprint.items()))
+
+
+async def _fetch_blueprint_schema(client: httpx.AsyncClient, settings: PortSettings, blueprint: str) -> Dict[str, Any]:
+    """Fetch the schema for a blueprint from Port."""
     # Check if token needs refresh
     if settings.token_expired:
         await settings.get_access_token(client)
     
-    url = f"{settings.PORT_BASE_URL}/blueprints/{blueprint}"
-    response = await client.get(url, headers=settings.headers)
-    return response.json()
+    url = settings.blueprint_url(blueprint)
+    response = await _request_with_retries(client, "GET", url, headers=settings.headers)
+    if response.status_code != 200:
+        raise ValueError(f"Failed to fetch schema of blueprint '{blueprint}': {response.text}")
+    return orjson.loads(response.content)
+
+
+async def get_blueprint_schema(client: httpx.AsyncClient, settings: PortSettings, blueprint: str) -> Dict[str, Any]:
+    """Get the schema for a blueprint from Port, fetched once for the lifetime of the process."""
+    # Every file of a blueprint shares one fetch, whether it succeeds or fails
+    task = _schema_tasks.get(blueprint)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_blueprint_schema(client, settings, blueprint))
+        _schema_tasks[blueprint] = task
+    # Shield so a cancelled caller doesn't cancel the fetch for everyone else
+    return await asyncio.shield(task)
+
+
+async def check_entity_and_schema(client: httpx.AsyncClient, settings: PortSettings, identifier: str, blueprint: str) -> Tuple[bool, Dict[str, Any]]:
+    """Check whether an entity exists and fetch its blueprint schema concurrently."""
+    exists, blueprint_data = await asyncio.gather(
+        get_entity(client, settings, identifier, blueprint),
+        get_blueprint_schema(client, settings, blueprint),
+    )
+    return exists, blueprint_data
 
 
-async def validate_required_fields_and_relations(client: httpx.AsyncClient, settings: PortSettings, data: Dict[str, Any], blueprint_name: str) -> List[str]:
+async def validate_required_fields_and_relations(client: httpx.AsyncClient, settings: PortSettings, data: Dict[str, Any], blueprint_name: str, blueprint_data: Optional[Dict[str, Any]] = None) -> List[str]:
     """Validate that all required fields and relations from the blueprint schema are present in the data."""
     errors = []
     relations_errors = []
     
     try:
-        # Get the blueprint schema from Port API
-        blueprint_data = await get_blueprint_schema(client, settings, blueprint_name)
+        # Get the blueprint schema from Port API unless the caller already has it
+        if blueprint_data is None:
+            blueprint_data = await get_blueprint_schema(client, settings, blueprint_name)
         
         # Extract required fields from the schema
         required_fields = blueprint_data.get("blueprint", {}).get("schema", {}).get("required", [])
@@ -84,34 +216,42 @@ async def validate_required_fields_and_relations(client: httpx.AsyncClient, sett
 
 async def validate_entity(client: httpx.AsyncClient, settings: PortSettings, payload: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
     """Validate an entity against Port's API."""
-    # Check if token needs refresh
-    if settings.token_expired:
-        await settings.get_access_token(client)
-    
     try:
         blueprint = payload.get("blueprint", "")
         identifier = payload.get("identifier", "")
         
-        url = f"{settings.PORT_BASE_URL}/blueprints/{blueprint}/entities/{identifier}"
-        print(f"Checking if entity exists at {url}")
-        
-        get_response = await client.get(url, headers=settings.headers)
-        entity_exists = get_response.status_code == 200
+        logger.debug(f"Checking if entity '{identifier}' of blueprint '{blueprint}' exists")
+        entity_exists = await get_entity(client, settings, identifier, blueprint)
         
         if entity_exists:
-            print(f"Entity '{identifier}' of blueprint '{blueprint}' exists")
+            logger.debug(f"Entity '{identifier}' of blueprint '{blueprint}' exists")
             return True, {"message": "Entity exists"}
         else:
-            print(f"Entity '{identifier}' of blueprint '{blueprint}' does not exist — updates only allowed on existing entities")
+            logger.debug(f"Entity '{identifier}' of blueprint '{blueprint}' does not exist — updates only allowed on existing entities")
             return False, {"error": "Entity does not exist. Only updates to existing entities are allowed."}
             
     except Exception as e:
-        print(f"❌ Error during entity validation: {str(e)}")
+        logger.error(f"❌ Error during entity validation: {str(e)}")
         return False, {"error": str(e)}
 
 
+def _scan_yaml_files(path) -> List[Path]:
+    """List YAML files directly inside a directory in a single scandir pass."""
+    yaml_files = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                # Filter on the name first; DirEntry caches readdir's d_type, so
+                # is_file() only stats entries that are symlinks
+                if entry.name.endswith(YAML_EXTENSIONS) and entry.is_file():
+                    yaml_files.append(Path(entry.path))
+    except PermissionError:
+        pass
+    return yaml_files
+
+
 def find_yaml_files(paths: List[str] = None) -> List[Path]:
-    """Find YAML files to validate, excluding those in .github directory."""
+    """Find YAML files to validate; directory scans exclude the .github directory."""
     changed_files = []
     
     # If paths are provided, use them; otherwise scan the current directory
@@ -120,42 +260,55 @@ def find_yaml_files(paths: List[str] = None) -> List[Path]:
             p = Path(path)
             if p.is_dir():
                 # Only include files directly in the specified directory, not in subdirectories
-                changed_files.extend([f for f in p.glob("*.yaml") if ".github" not in str(f)])
-                changed_files.extend([f for f in p.glob("*.yml") if ".github" not in str(f)])
-            elif p.is_file() and p.suffix.lower() in (".yaml", ".yml") and ".github" not in str(p):
+                # .github is excluded once at directory level rather than per file
+                if ".github" not in p.parts:
+                    changed_files.extend(_scan_yaml_files(p))
+            elif p.is_file() and p.suffix.lower() in YAML_EXTENSIONS:
+                # Explicitly listed files are validated even when they live under .github
                 changed_files.append(p)
             else:
-                print(f"Warning: {path} is not a YAML file or directory")
+                logger.warning(f"Warning: {path} is not a YAML file or directory")
     else:
         # Only include files directly in the root directory, not in subdirectories
-        changed_files = [f for f in Path(".").glob("*.yaml") if ".github" not in str(f)]
-        changed_files.extend([f for f in Path(".").glob("*.yml") if ".github" not in str(f)])
+        changed_files = _scan_yaml_files(".")
     
     return changed_files
 
 
-async def process_file(client: httpx.AsyncClient, settings: PortSettings, file_path: Path) -> List[str]:
-    """Process a single YAML file and return any errors."""
-    errors = []
-    
+def parse_file(file_path: Path) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """Parse a single YAML file and check its basic structure, returning the data and any errors."""
     try:
-        with open(file_path) as f:
+        with open(file_path, "rb") as f:
             try:
-                data = yaml.safe_load(f)
+                data = _yaml_load(f)
             except yaml.YAMLError as e:
-                return [f"YAML parse error in {file_path}: {str(e)}"]
+                return None, [f"YAML parse error in {file_path}: {str(e)}"]
         
         try:
-            port_yaml = PortYaml(**data)
+            PortYaml.model_validate(data)
         except ValueError as e:
-            return [f"Invalid YAML structure in {file_path}: {str(e)}"]
+            return None, [f"Invalid YAML structure in {file_path}: {str(e)}"]
             
-        identifier = port_yaml.identifier
-        blueprint = port_yaml.blueprint
+    except Exception as e:
+        return None, [f"Error processing {file_path}: {str(e)}"]
+        
+    return data, []
+
+
+async def process_file(client: httpx.AsyncClient, settings: PortSettings, file_path: Path, data: Dict[str, Any]) -> List[str]:
+    """Validate a parsed YAML file against Port and return any errors."""
+    errors = []
+    
+    try:
+        identifier = data["identifier"]
+        blueprint = data["blueprint"]
+        
+        # Check entity existence and fetch the blueprint schema in one step
+        exists, blueprint_data = await check_entity_and_schema(client, settings, identifier, blueprint)
         
         # Validate required fields from blueprint schema
-        print(f"Validating required fields for {file_path} against {blueprint} blueprint schema...")
-        schema_errors, relations_errors = await validate_required_fields_and_relations(client, settings, data, blueprint)
+        logger.debug(f"Validating required fields for {file_path} against {blueprint} blueprint schema...")
+        schema_errors, relations_errors = await validate_required_fields_and_relations(client, settings, data, blueprint, blueprint_data)
         if schema_errors:
             errors.extend(schema_errors)
             return errors
@@ -164,9 +317,7 @@ async def process_file(client: httpx.AsyncClient, settings: PortSettings, file_p
             errors.extend(relations_errors)
             return errors
         
-        # Check if entity exists
-        exists = await get_entity(client, settings, identifier, blueprint)
-        print(f"Entity '{identifier}' of blueprint '{blueprint}' exists: {exists}")
+        logger.debug(f"Entity '{identifier}' of blueprint '{blueprint}' exists: {exists}")
         if not exists:
             errors.append(f"Entity '{identifier}' of blueprint '{blueprint}' does not exist — updates only allowed")
             
@@ -1,17 +1,22 @@
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, ConfigDict, model_validator
+
+
 class PortYaml(BaseModel):
     """Basic validation model for Port YAML files."""
+    # Surrounding whitespace is stripped while parsing, so blank values arrive empty
+    model_config = ConfigDict(frozen=True, str_strip_whitespace=True)
+    
     identifier: str
     blueprint: str
     
-    @validator("identifier")
-    def validate_identifier(cls, v):
-        if not v:
-            raise ValueError("Identifier must be provided")
-        return v
-
-    @validator("blueprint")
-    def validate_blueprint(cls, v):
-        if not v:
-            raise ValueError("Blueprint must be provided")
-        return v
+    @model_validator(mode="after")
+    def validate_required_values(self):
+        # Report every blank field at once, not just the first
+        missing = [
+            f"{label} must be provided"
+            for name, label in (("identifier", "Identifier"), ("blueprint", "Blueprint"))
+            if not getattr(self, name)
+        ]
+        if missing:
+            raise ValueError("; ".join(missing))
+        return self
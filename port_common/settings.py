@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 import time
+import logging
+import asyncio
 import httpx
 from typing import Dict
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+logger = logging.getLogger(__name__)
+
 class PortSettings(BaseSettings):
     """Settings for Port API authentication and configuration."""
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
@@ -17,16 +21,35 @@ class PortSettings(BaseSettings):
         self._access_token = None
         self._token_expiry = 0  # Unix timestamp when token expires
         self._buffer_seconds = 60  # Buffer time before expiry to refresh token
+        self._headers = None  # Rebuilt only when the access token changes
+        self._token_lock = None  # Serializes token refreshes across coroutines
+        self._blueprint_url_template = f"{self.PORT_BASE_URL}/blueprints/{{blueprint}}"
+        self._entity_url_template = f"{self.PORT_BASE_URL}/blueprints/{{blueprint}}/entities/{{identifier}}"
+        self._entities_search_url = f"{self.PORT_BASE_URL}/entities/search"
     
     @property
     def headers(self) -> Dict[str, str]:
         """Get headers for API requests, including authorization."""
         if not self._access_token:
             raise ValueError("Access token not obtained. Call get_access_token() first.")
-        return {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self._access_token}"
-        }
+        if self._headers is None:
+            self._headers = {
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {self._access_token}"
+            }
+        return self._headers
+    
+    def blueprint_url(self, blueprint: str) -> str:
+        """Get the API URL of a blueprint."""
+        return self._blueprint_url_template.format(blueprint=blueprint)
+    
+    def entity_url(self, blueprint: str, identifier: str) -> str:
+        """Get the API URL of an entity."""
+        return self._entity_url_template.format(blueprint=blueprint, identifier=identifier)
+    
+    def entities_search_url(self) -> str:
+        """Get the API URL for searching entities."""
+        return self._entities_search_url
     
     @property
     def token_expired(self) -> bool:
@@ -39,7 +62,19 @@ class PortSettings(BaseSettings):
         # If we already have a valid token, return it
         if self._access_token and not self.token_expired:
             return self._access_token
-            
+        
+        # Created lazily so the lock binds to the running event loop
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        
+        async with self._token_lock:
+            # Another coroutine may have refreshed the token while we waited
+            if self._access_token and not self.token_expired:
+                return self._access_token
+            return await self._request_access_token(client)
+    
+    async def _request_access_token(self, client: httpx.AsyncClient) -> str:
+        """Request a new access token from Port API."""
         url = f"{self.PORT_BASE_URL}/auth/access_token"
         payload = {
             "clientId": self.PORT_CLIENT_ID,
@@ -47,16 +82,17 @@ class PortSettings(BaseSettings):
         }
         
         try:
-            print(f"Requesting token from {url}")
+            logger.debug(f"Requesting token from {url}")
             response = await client.post(url, json=payload)
-            print(f"Response status: {response.status_code}")
+            logger.debug(f"Response status: {response.status_code}")
             
             if response.status_code != 200:
-                print(f"Auth error: {response.text}")
+                logger.debug(f"Auth error: {response.text}")
                 raise ValueError(f"Failed to obtain access token: {response.text}")
                 
             data = response.json()
             self._access_token = data.get("accessToken")
+            self._headers = None
             if not self._access_token:
                 raise ValueError("Access token not found in response")
                 
@@ -64,9 +100,9 @@ class PortSettings(BaseSettings):
             expires_in = data.get("expiresIn", 3600)  # Default to 1 hour if not specified
             self._token_expiry = time.time() + expires_in
                 
-            print("✅ Successfully obtained access token (expires in", expires_in, "seconds)")
+            logger.info(f"✅ Successfully obtained access token (expires in {expires_in} seconds)")
             return self._access_token
             
         except Exception as e:
-            print(f"❌ Error during token request: {str(e)}")
+            logger.debug(f"❌ Error during token request: {str(e)}")
             raise ValueError(f"Failed to obtain access token: {str(e)}")